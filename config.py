@@ -52,4 +52,38 @@ AZURE_OPENAI_EMBED_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBED_DEPLOYMENT")
 AZURE_STORAGE_ACCOUNT = os.getenv("AZURE_STORAGE_ACCOUNT")
 AZURE_STORAGE_KEY = os.getenv("AZURE_STORAGE_KEY")
 AZURE_STORAGE_CONTAINER = os.getenv("AZURE_STORAGE_CONTAINER")
-AZURE_STORAGE_ENDPOINT = os.getenv("AZURE_STORAGE_ENDPOINT")
\ No newline at end of file
+AZURE_STORAGE_ENDPOINT = os.getenv("AZURE_STORAGE_ENDPOINT")
+
+# 후속 질문 재사용을 위한 검색 결과 캐시 설정
+# 이전 턴 문서들의 상위 N개 코사인 유사도 평균이 임계값 이상이면 재검색 없이 로컬 재정렬한다.
+RETRIEVAL_CACHE_MIN_SCORE = float(os.getenv("RETRIEVAL_CACHE_MIN_SCORE", "0.4"))
+RETRIEVAL_CACHE_TOP_N = int(os.getenv("RETRIEVAL_CACHE_TOP_N", "5"))
+# 캐시 적중 시 프롬프트에 넣을 최대 리뷰 수(임계값 이상인 것만, 캐시에 담긴 순서 유지)
+RETRIEVAL_CACHE_TOP_K = int(os.getenv("RETRIEVAL_CACHE_TOP_K", "20"))
+
+# 지연 시간 제어 설정(초)
+# 단계별 데드라인과 요청 전체 예산. 검색이 SEARCH_HEDGE_AFTER_SEC(p95 예산)를 넘기면 동일 요청을 한 번 더 보낸다.
+REQUEST_BUDGET_SEC = float(os.getenv("REQUEST_BUDGET_SEC", "90"))
+EMBED_DEADLINE_SEC = float(os.getenv("EMBED_DEADLINE_SEC", "3"))
+SEARCH_HEDGE_AFTER_SEC = float(os.getenv("SEARCH_HEDGE_AFTER_SEC", "2"))
+SEARCH_DEADLINE_SEC = float(os.getenv("SEARCH_DEADLINE_SEC", "10"))
+FACETS_DEADLINE_SEC = float(os.getenv("FACETS_DEADLINE_SEC", "3"))
+# 동시에 처리할 질문 수(모든 Streamlit 세션 합계). 워커 풀을 이만큼의 최악의 경우 호출 수에 맞춰 잡는다.
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "8"))
+
+# "1"이면 API 호출 없이 로컬 합성 임베딩을 사용(util/synthetic_reviews.py, 대용량 벤치마크용)
+USE_SYNTHETIC_EMBEDDINGS = os.getenv("USE_SYNTHETIC_EMBEDDINGS") == "1"
+
+# "1"이면 적재 시 근사 중복 리뷰를 대표 리뷰로 묶고(util/init_vector_index.py), facet 통계를
+# duplicate_count(대표 리뷰가 대신하는 리뷰 수)로 가중한다. 적재와 앱에 같은 값을 써야 통계가 원본 리뷰 수와 맞는다.
+# duplicate_count 필드가 있는 인덱스(util/init_vector_index.py로 다시 적재)에서만 켠다. 없는 인덱스에서 켜면 검색이 HTTP 400으로 실패한다.
+# 켜면 facet 값마다 검색 요청이 하나씩 더 나가며, 질문당 추가 요청은 DEDUP_FACET_MAX_REQUESTS개로 제한한다.
+# 가중은 필드 단위로만 적용하므로, 기본값은 필터를 하나도 고르지 않았을 때의 facet 값 수(모든 필드를 가중)다.
+DEDUP_WEIGHTED_FACETS = os.getenv("DEDUP_WEIGHTED_FACETS", "0") == "1"
+DEDUP_FACET_MAX_REQUESTS = int(os.getenv("DEDUP_FACET_MAX_REQUESTS", str(sum(len(cfg["pool"]) for cfg in CATEGORY_CONFIG))))
+
+# 토큰 비용 계산 단가(USD / 1M tokens, 기본값은 gpt-4.1 기준)와 세션 비용 예산(0이면 미사용)
+PRICE_INPUT_PER_1M = float(os.getenv("PRICE_INPUT_PER_1M", "2.00"))
+PRICE_CACHED_INPUT_PER_1M = float(os.getenv("PRICE_CACHED_INPUT_PER_1M", "0.50"))
+PRICE_OUTPUT_PER_1M = float(os.getenv("PRICE_OUTPUT_PER_1M", "8.00"))
+SESSION_COST_BUDGET_USD = float(os.getenv("SESSION_COST_BUDGET_USD", "0"))
@@ -1,6 +1,8 @@
-PROMPT_INSIGHT = """
+# 정적 지시문은 system 메시지로 분리해 매 요청 바이트 단위로 동일하게 유지한다(프롬프트 prefix 캐시 적용 대상).
+# 여기에 요청마다 바뀌는 값(날짜, 필터 등)을 넣지 않는다.
+PROMPT_INSIGHT_SYSTEM = """
 당신은 고객 피드백 분석 전문가이자, 상품 기획 및 CX 컨설턴트입니다.
-아래는 고객 리뷰 데이터에서 검색된 문서들입니다.
+사용자 메시지로 고객 리뷰 데이터에서 검색된 문서들과 질문이 주어집니다.
 각 문서는 실제 고객의 의견으로, 특정 제품군(product_group), 연령대(age_group), 성별(gender), 평점(rating)에 대한 리뷰 텍스트(review_text)로 구성되어 있습니다.
 
 당신의 역할은:
@@ -23,10 +25,13 @@ PROMPT_INSIGHT = """
 **[추가 제안]**
 - 기획자/마케터가 바로 활용할 수 있는 구체적 인사이트 1~2줄
 ---
+"""
 
-질문 내용은 다음과 같습니다:
-{query}
-
+# 요청마다 바뀌는 부분. 후속 질문에서 같은 리뷰가 재사용되면 prefix가 더 길게 겹치도록 리뷰를 질문보다 앞에 둔다.
+PROMPT_INSIGHT_USER = """
 검색된 리뷰들은 다음과 같습니다:
 {sources}
+
+질문 내용은 다음과 같습니다:
+{query}
 """
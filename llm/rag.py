@@ -1,41 +1,71 @@
 import os
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 from azure.search.documents import SearchClient
 from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
-from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
-from llm.prompt import PROMPT_INSIGHT
-from typing import Dict, Optional
+from openai import APIError, APITimeoutError, AzureOpenAI
+from azure.core.exceptions import AzureError, ClientAuthenticationError, HttpResponseError
+from llm.prompt import PROMPT_INSIGHT_SYSTEM, PROMPT_INSIGHT_USER
+from llm.usage import extract_usage
+from typing import Callable, Dict, List, Optional
 from azure.search.documents.models import VectorizedQuery
 from langchain_openai import AzureOpenAIEmbeddings
-from config import AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_DEPLOYMENT, AZURE_OPENAI_EMBED_DEPLOYMENT, AZURE_SEARCH_API_KEY, AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_INDEX_NAME
+from config import AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_DEPLOYMENT, AZURE_OPENAI_EMBED_DEPLOYMENT, AZURE_SEARCH_API_KEY, AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_INDEX_NAME, RETRIEVAL_CACHE_MIN_SCORE, RETRIEVAL_CACHE_TOP_N, RETRIEVAL_CACHE_TOP_K
+from config import REQUEST_BUDGET_SEC, EMBED_DEADLINE_SEC, SEARCH_HEDGE_AFTER_SEC, SEARCH_DEADLINE_SEC, FACETS_DEADLINE_SEC, MAX_CONCURRENT_REQUESTS, USE_SYNTHETIC_EMBEDDINGS, DEDUP_WEIGHTED_FACETS, DEDUP_FACET_MAX_REQUESTS
 
-def get_answer(user_text: str, selected_filters: Dict[str, Optional[str]]) -> tuple:
 
-    """ RAG 접근 방식을 사용하여 사용자 질문에 답변을 생성합니다. """
+# 한 질문이 _executor에서 동시에 잡을 수 있는 최대 워커 수(임베딩 1 + 검색 2(hedging) + facet 1).
+# 데드라인이 지난 호출도 SDK 타임아웃까지는 워커를 잡고 있으므로 모두 동시에 살아 있을 수 있다.
+_WORKERS_PER_REQUEST = 4
 
-    try:
-        search_credential = AzureKeyCredential(AZURE_SEARCH_API_KEY)
+# 단계별 데드라인 적용을 위해 임베딩/검색/facet 호출을 실행하는 공용 워커 풀(모든 세션이 공유).
+# 워커가 모자라 대기열에서 기다린 시간도 단계 데드라인에 포함되므로 동시 질문 수의 최악의 경우에 맞춘다
+_executor = ThreadPoolExecutor(max_workers=_WORKERS_PER_REQUEST * MAX_CONCURRENT_REQUESTS)
+# facet 가중치 계산용 하위 요청 전용 풀(facet 워커 안에서 기다리므로 _executor와 분리).
+# 질문마다 가중 요청이 한꺼번에 나가도록 요청 한도만큼 워커를 둔다
+_facet_executor = ThreadPoolExecutor(max_workers=DEDUP_FACET_MAX_REQUESTS * MAX_CONCURRENT_REQUESTS)
 
-        # Initialize the OpenAI client
-        openai_client = AzureOpenAI(api_version="2024-06-01",
-                                    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-                                    api_key=AZURE_OPENAI_API_KEY,
-        )
+def get_answer(
+    user_text: str,
+    selected_filters: Dict[str, Optional[str]],
+    retrieval_cache: Optional[dict] = None,
+    openai_client=None,
+    search_client=None,
+    embeddings=None,
+) -> tuple:
+
+    """
+    RAG 접근 방식을 사용하여 사용자 질문에 답변을 생성합니다.
+
+    retrieval_cache: 세션별 검색 결과 캐시(dict). 전달되면 직전 턴과 필터가 같을 때
+    이전 검색 문서를 새 질문 기준으로 로컬 재정렬하고, 새로 검색한 경우 캐시를 갱신합니다.
+
+    openai_client, search_client, embeddings: 전달하지 않으면 단계별 타임아웃이 설정된
+    기본 클라이언트를 생성합니다(지연 상황 점검용 스텁을 넣을 수 있습니다).
 
-        # Initialize the Search client
-        search_client = SearchClient(endpoint=AZURE_SEARCH_ENDPOINT,
-                                    index_name=AZURE_SEARCH_INDEX_NAME,
-                                    credential=search_credential)
+    반환값의 마지막 요소(trace)에는 단계별 소요 시간(stage_seconds, 워커 풀 대기 시간은
+    "<단계>_queue" 키로 따로 기록), 지연으로 인해 적용된 대체 경로(fallbacks),
+    답변 생성의 토큰 사용량과 예상 비용(usage)이 기록됩니다.
+    """
+
+    deadline = time.monotonic() + REQUEST_BUDGET_SEC
+    trace = {"fallbacks": [], "stage_seconds": {}}
+
+    try:
+        openai_client = openai_client or build_openai_client()
+        search_client = search_client or build_search_client()
+        embeddings = embeddings or build_embeddings()
     
     except ClientAuthenticationError as auth_error:
-        return f"인증 오류가 발생했습니다. API 키와 엔드포인트를 확인하세요. {str(auth_error)}", None, None
+        return f"인증 오류가 발생했습니다. API 키와 엔드포인트를 확인하세요. {str(auth_error)}", None, None, trace
 
     except HttpResponseError as http_error:
-        return f"HTTP 응답 오류가 발생했습니다. {str(http_error)}", None, None
+        return f"HTTP 응답 오류가 발생했습니다. {str(http_error)}", None, None, trace
 
     except Exception as e:
-        return f"알 수 없는 오류가 발생했습니다. {str(e)}", None, None
+        return f"알 수 없는 오류가 발생했습니다. {str(e)}", None, None, trace
     
     ls_filter = [
         f"{field} eq '{value}'"
@@ -53,13 +83,6 @@ def get_answer(user_text: str, selected_filters: Dict[str, Optional[str]]) -> tu
     print(filter_expression)
     print(ls_facets)
 
-    embeddings = AzureOpenAIEmbeddings(
-        azure_deployment=AZURE_OPENAI_EMBED_DEPLOYMENT,
-        openai_api_version="2024-12-01-preview",
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        api_key=AZURE_OPENAI_API_KEY,
-    )
-
     # Semantic 검색 방식
     # result = search_client.search(
     #     search_text=user_text,
@@ -71,33 +94,133 @@ def get_answer(user_text: str, selected_filters: Dict[str, Optional[str]]) -> tu
     #     facets=ls_facets
     # )
 
-    # Hybrid 검색 방식(Semantic 검색 + Vector 검색)
-    vector_query = VectorizedQuery(
-            vector=embeddings.embed_query(user_text),
-            k_nearest_neighbors=50,
-            fields="review_vector",
-            kind="vector",
-            exhaustive=True
-    )
+    stage_start = time.monotonic()
+    embed_future = _submit(_executor, trace, "embedding", embeddings.embed_query, user_text)
+    try:
+        query_vector = embed_future.result(timeout=_remaining(deadline, EMBED_DEADLINE_SEC))
+    except TimeoutError:
+        # 임베딩이 늦으면 벡터 검색 없이 텍스트 + 시맨틱 검색으로 진행
+        query_vector = None
+        trace["fallbacks"].append("embedding_timeout")
+    except APIError as embed_error:
+        # SDK 재시도를 껐으므로 일시적인 429/5xx도 지연과 같은 방식으로 대체한다
+        print(f"임베딩 오류 : {embed_error}")
+        query_vector = None
+        trace["fallbacks"].append("embedding_error")
+    trace["stage_seconds"]["embedding"] = time.monotonic() - stage_start
 
-    result = search_client.search(
-            search_text=user_text,
-            query_type="semantic",
-            semantic_configuration_name="sem-config",
-            top=50,
-            select=["product_name", "product_group", "gender", "age_group", "rating", "review_text"],
-            include_total_count=True,
-            filter=filter_expression,
-            facets=ls_facets,            
-            vector_queries=[vector_query],
-    )
+    # Hybrid 검색 방식(Semantic 검색 + Vector 검색), 임베딩이 없으면 Semantic 검색만 수행
+    vector_queries = None
+    if query_vector is not None:
+        vector_queries = [
+            VectorizedQuery(
+                vector=query_vector,
+                k_nearest_neighbors=50,
+                fields="review_vector",
+                kind="vector",
+                exhaustive=True
+            )
+        ]
+
+    select = ["product_name", "product_group", "gender", "age_group", "rating", "review_text"]
+    if DEDUP_WEIGHTED_FACETS:
+        # duplicate_count 필드는 중복 제거(util/dedup.py)를 거쳐 다시 만든 인덱스에만 있다
+        select.append("duplicate_count")
+    if retrieval_cache is not None:
+        # 로컬 재정렬용 벡터는 캐시를 쓸 때만 받는다(50건 x 1536차원, 응답이 약 0.7MB 커진다)
+        select.append("review_vector")
+
+    def run_search() -> list:
+        # SearchItemPaged는 순회할 때 요청을 보내므로 워커 안에서 결과를 모두 읽는다
+        return list(search_client.search(
+                search_text=user_text,
+                query_type="semantic",
+                semantic_configuration_name="sem-config",
+                top=50,
+                select=select,
+                include_total_count=True,
+                filter=filter_expression,
+                vector_queries=vector_queries,
+        ))
+
+    def run_facet_query(facet_filter: Optional[str], facet_fields: List[str]) -> dict:
+        return search_client.search(
+                search_text=user_text,
+                top=0,
+                filter=facet_filter,
+                facets=facet_fields,
+                vector_queries=vector_queries,
+        ).get_facets()
+
+    def run_facets() -> dict:
+        # 통계가 늦어도 답변은 나갈 수 있도록 facet은 별도 요청으로 분리한다
+        started = time.monotonic()
+        facets = run_facet_query(filter_expression, ls_facets)
+        if facets and DEDUP_WEIGHTED_FACETS:
+            facets = weight_facets(
+                facets,
+                lambda value_filter: run_facet_query(
+                    " and ".join(f for f in [filter_expression, value_filter] if f),
+                    ["duplicate_count,count:1000"],
+                ).get("duplicate_count", []),
+                timeout=_remaining(deadline, FACETS_DEADLINE_SEC - (time.monotonic() - started)),
+                trace=trace,
+            )
+        return facets
+
+    docs = None
+    facets = None
+    if (
+        query_vector is not None
+        and retrieval_cache is not None
+        and retrieval_cache.get("filters") == selected_filters
+    ):
+        docs = rerank_cached_docs(query_vector, retrieval_cache)
+        if docs is not None:
+            print(f"캐시된 검색 결과 재사용 : {len(docs)}건")
+            trace["retrieval_cache_hit"] = True
+            facets = retrieval_cache.get("facets")
+            if ls_facets and not facets:
+                # 이전 턴에서 통계가 늦어 비어 있던 경우 이번 턴에 다시 받는다
+                stage_start = time.monotonic()
+                facets = _collect_facets(_submit(_executor, trace, "facets", run_facets), stage_start, deadline, trace)
+                retrieval_cache["facets"] = facets
+
+    if docs is None:
+        stage_start = time.monotonic()
+        facets_future = _submit(_executor, trace, "facets", run_facets) if ls_facets else None
+
+        try:
+            docs = _hedged_call(
+                run_search,
+                hedge_after=SEARCH_HEDGE_AFTER_SEC,
+                timeout=_remaining(deadline, SEARCH_DEADLINE_SEC),
+                trace=trace,
+                name="search",
+            )
+        except TimeoutError:
+            trace["fallbacks"].append("search_timeout")
+            return "검색 응답이 지연되고 있습니다. 잠시 후 다시 시도해 주세요.", None, None, trace
+        except AzureError as search_error:
+            print(f"검색 오류 : {search_error}")
+            trace["fallbacks"].append("search_error")
+            return "검색 중 오류가 발생했습니다. 잠시 후 다시 시도해 주세요.", None, None, trace
+        trace["stage_seconds"]["search"] = time.monotonic() - stage_start
+
+        if facets_future is not None:
+            facets = _collect_facets(facets_future, stage_start, deadline, trace)
+        print(f"리뷰 건수 : {facets}")
+
+        if retrieval_cache is not None:
+            retrieval_cache.clear()
+            retrieval_cache.update({
+                "filters": dict(selected_filters),
+                "docs": docs,
+                "facets": facets,
+            })
 
-    facets = result.get_facets()
-    print(f"리뷰 건수 : {facets}")
-    
-    docs = list(result)
     if not docs:
-        return "관련 정보를 찾지 못했습니다.", None, None
+        return "관련 정보를 찾지 못했습니다.", None, None, trace
 
     # sources = "\n".join(
     #     f"- {doc.get('product_name', '')} ({doc.get('product_group', '')}, "
@@ -112,28 +235,51 @@ def get_answer(user_text: str, selected_filters: Dict[str, Optional[str]]) -> tu
             "product_group": doc.get("product_group", ""),
             "gender": doc.get("gender", ""),
             "age_group": doc.get("age_group", ""),
-            "review_text": doc.get("review_text", "")
+            "review_text": doc.get("review_text", ""),
         } 
         for doc in docs
     ]
+    if DEDUP_WEIGHTED_FACETS:
+        for source, doc in zip(sources, docs):
+            source["duplicate_count"] = doc.get("duplicate_count") or 1
 
     print(sources)
 
-    prompt = PROMPT_INSIGHT.format(query=user_text, sources=sources)
+    prompt = PROMPT_INSIGHT_USER.format(query=user_text, sources=sources)
     
-    response = openai_client.chat.completions.create(
-            model=AZURE_OPENAI_DEPLOYMENT,
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
+    stage_start = time.monotonic()
+    try:
+        # 재시도가 남은 예산을 넘기지 않도록 completion은 재시도 없이 남은 시간만큼만 기다린다
+        response = openai_client.with_options(
+            max_retries=0,
+            timeout=_remaining(deadline, REQUEST_BUDGET_SEC),
+        ).chat.completions.create(
+                model=AZURE_OPENAI_DEPLOYMENT,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": PROMPT_INSIGHT_SYSTEM
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+            )
+    except APITimeoutError:
+        trace["fallbacks"].append("completion_timeout")
+        return "답변 생성이 지연되고 있습니다. 잠시 후 다시 시도해 주세요.", None, sources, trace
+    except APIError as completion_error:
+        print(f"답변 생성 오류 : {completion_error}")
+        trace["fallbacks"].append("completion_error")
+        return "답변 생성 중 오류가 발생했습니다. 잠시 후 다시 시도해 주세요.", None, sources, trace
+    trace["stage_seconds"]["completion"] = time.monotonic() - stage_start
+    trace["usage"] = extract_usage(response)
     
     rag_answer = response.choices[0].message.content
+    print(f"지연 시간/토큰 사용량 기록 : {trace}")
     
-    return rag_answer, summarize_statistics(facets) if facets else None, sources
+    return rag_answer, summarize_statistics(facets) if facets else None, sources, trace
 
 
 def summarize_statistics(data: dict) -> str:
@@ -165,3 +311,203 @@ def summarize_statistics(data: dict) -> str:
         )
 
     return "\n\n".join(summaries)
+
+
+def weight_facets(facets: dict, fetch_duplicate_buckets: Callable[[str], list], timeout: float, trace: dict) -> dict:
+    """
+    facet 건수(대표 리뷰 수)를 근사 중복까지 포함한 원본 리뷰 수로 바꾼다.
+    facet 값마다 duplicate_count 분포를 받아 (duplicate_count - 1) x 건수만큼 더하며,
+    duplicate_count가 없는 문서(중복 제거 없이 적재된 리뷰)는 1건으로 센다.
+
+    facet 값 하나당 검색 요청이 하나씩 더 나가므로, 값이 적은 필드부터 필드 단위로
+    DEDUP_FACET_MAX_REQUESTS개 안에서만 요청한다. 한 필드 안에 가중한 값과 가중하지 않은 값이
+    섞이면 총합/최다 항목이 틀어지므로, 요청 한도에 들지 못했거나 timeout 안에 값 하나라도
+    끝나지 않은 필드는 통째로 대표 리뷰 수 그대로 두고 trace에 facets_unweighted로 기록한다.
+    """
+    budget = DEDUP_FACET_MAX_REQUESTS
+    futures = {}
+    for field in sorted(facets, key=lambda f: len(facets[f])):
+        if len(facets[field]) > budget:
+            continue
+        budget -= len(facets[field])
+        futures[field] = [
+            _submit(_facet_executor, trace, "facets_weighting", fetch_duplicate_buckets, f"{field} eq '{bucket['value']}'")
+            for bucket in facets[field]
+        ]
+    wait([future for field_futures in futures.values() for future in field_futures], timeout=timeout)
+
+    weighted = {}
+    unweighted_fields = []
+    for field, buckets in facets.items():
+        field_futures = futures.get(field, [])
+        if not field_futures or any(not f.done() or f.exception() is not None for f in field_futures):
+            for future in field_futures:
+                future.cancel()
+            unweighted_fields.append(field)
+            weighted[field] = buckets
+            continue
+        weighted[field] = [
+            {
+                **bucket,
+                "count": bucket["count"] + sum(
+                    (int(dup["value"]) - 1) * dup["count"]
+                    for dup in future.result()
+                    if dup.get("value")
+                ),
+            }
+            for bucket, future in zip(buckets, field_futures)
+        ]
+
+    if unweighted_fields:
+        trace["fallbacks"].append("facets_unweighted")
+        trace["unweighted_facets"] = unweighted_fields
+    return weighted
+
+
+def rerank_cached_docs(query_vector: List[float], retrieval_cache: dict) -> Optional[list]:
+    """
+    캐시된 문서 중 새 질문 벡터와의 코사인 유사도가 RETRIEVAL_CACHE_MIN_SCORE 이상인
+    상위 RETRIEVAL_CACHE_TOP_K개를 골라, 캐시에 담긴 원래 순서 그대로 반환한다.
+    순서를 유지해야 후속 질문의 프롬프트가 같은 리뷰 목록으로 시작해 prefix 캐시가 적용된다.
+
+    상위 RETRIEVAL_CACHE_TOP_N개 점수의 평균이 RETRIEVAL_CACHE_MIN_SCORE 미만이면
+    이전 검색 결과로는 답하기 어렵다고 보고 None을 반환한다(재검색 필요).
+    """
+    cached_docs = retrieval_cache.get("docs") or []
+    scored = [
+        (_cosine_similarity(query_vector, doc["review_vector"]), position)
+        for position, doc in enumerate(cached_docs)
+        if doc.get("review_vector")
+    ]
+    if not scored:
+        return None
+
+    scored.sort(key=lambda x: x[0], reverse=True)
+    top_scores = [score for score, _ in scored[:RETRIEVAL_CACHE_TOP_N]]
+    mean_score = sum(top_scores) / len(top_scores)
+    print(f"캐시 후보 유사도(상위 {len(top_scores)}개 평균) : {mean_score:.3f}")
+
+    if mean_score < RETRIEVAL_CACHE_MIN_SCORE:
+        return None
+
+    selected = sorted(
+        position
+        for score, position in scored[:RETRIEVAL_CACHE_TOP_K]
+        if score >= RETRIEVAL_CACHE_MIN_SCORE
+    )
+    return [cached_docs[position] for position in selected]
+
+
+def build_openai_client() -> AzureOpenAI:
+    return AzureOpenAI(api_version="2024-10-21",
+                       azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                       api_key=AZURE_OPENAI_API_KEY,
+    )
+
+
+def build_search_client() -> SearchClient:
+    """
+    호출 자체도 데드라인 안에 끝나도록 SDK 타임아웃을 건 검색 클라이언트.
+    느린 응답과 일시적인 실패는 hedging(한 번 더 요청)으로 대응하므로 SDK 재시도는 끈다.
+    """
+    return SearchClient(endpoint=AZURE_SEARCH_ENDPOINT,
+                        index_name=AZURE_SEARCH_INDEX_NAME,
+                        credential=AzureKeyCredential(AZURE_SEARCH_API_KEY),
+                        connection_timeout=SEARCH_DEADLINE_SEC,
+                        read_timeout=SEARCH_DEADLINE_SEC,
+                        retry_total=0)
+
+
+def build_embeddings():
+    if USE_SYNTHETIC_EMBEDDINGS:
+        # 합성 데이터로 적재한 인덱스는 같은 로컬 임베딩으로 질의해야 한다
+        from util.synthetic_reviews import SyntheticEmbeddings
+        return SyntheticEmbeddings()
+
+    # 데드라인이 지난 임베딩 호출이 워커를 계속 잡고 있지 않도록 SDK 타임아웃을 맞추고 재시도는 끈다
+    return AzureOpenAIEmbeddings(
+        azure_deployment=AZURE_OPENAI_EMBED_DEPLOYMENT,
+        openai_api_version="2024-12-01-preview",
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_key=AZURE_OPENAI_API_KEY,
+        timeout=EMBED_DEADLINE_SEC,
+        max_retries=0,
+    )
+
+
+def _collect_facets(facets_future, stage_start: float, deadline: float, trace: dict) -> Optional[dict]:
+    """facet 요청을 FACETS_DEADLINE_SEC(stage_start 기준)까지 기다리고, 늦거나 실패하면 None을 반환한다."""
+    facets_limit = FACETS_DEADLINE_SEC - (time.monotonic() - stage_start)
+    try:
+        facets = facets_future.result(timeout=_remaining(deadline, facets_limit))
+    except TimeoutError:
+        # 통계가 늦으면 통계 블록 없이 답변한다
+        facets = None
+        trace["fallbacks"].append("facets_timeout")
+    except AzureError as facets_error:
+        print(f"통계 오류 : {facets_error}")
+        facets = None
+        trace["fallbacks"].append("facets_error")
+    trace["stage_seconds"]["facets"] = time.monotonic() - stage_start
+    return facets
+
+
+def _submit(executor: ThreadPoolExecutor, trace: dict, name: str, fn: Callable, *args):
+    """
+    executor에 fn(*args)를 넣고, 워커가 실제로 실행을 시작하기까지 기다린 시간을
+    trace["stage_seconds"]["<name>_queue"]에 기록한다(같은 이름이 여러 번이면 가장 긴 값).
+    단계 소요 시간과 분리해 두어야 백엔드 지연과 풀 포화로 인한 지연을 구분할 수 있다.
+    """
+    submitted = time.monotonic()
+
+    def run():
+        key = f"{name}_queue"
+        stage_seconds = trace.setdefault("stage_seconds", {})
+        stage_seconds[key] = max(time.monotonic() - submitted, stage_seconds.get(key, 0.0))
+        return fn(*args)
+
+    return executor.submit(run)
+
+
+def _remaining(deadline: float, stage_limit: float) -> float:
+    """단계 데드라인과 요청 전체 예산 중 더 빠른 쪽까지 남은 시간(초)."""
+    return max(0.0, min(stage_limit, deadline - time.monotonic()))
+
+
+def _hedged_call(fn: Callable, hedge_after: float, timeout: float, trace: dict, name: str):
+    """
+    fn을 실행하고 hedge_after초 안에 끝나지 않으면 같은 요청을 한 번 더 보내(hedging)
+    먼저 성공한 결과를 반환한다. 첫 요청이 그 전에 실패하면(429/5xx 등) 같은 방식으로 한 번만 다시 보낸다.
+    timeout 안에 어느 쪽도 끝나지 않으면 TimeoutError를, 모두 실패하면 마지막 오류를 던진다.
+    """
+    start = time.monotonic()
+    pending = {_submit(_executor, trace, name, fn)}
+    hedged = False
+    error = None
+    while pending:
+        limit = timeout if hedged else min(hedge_after, timeout)
+        done, pending = wait(
+            pending,
+            timeout=max(0.0, limit - (time.monotonic() - start)),
+            return_when=FIRST_COMPLETED,
+        )
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+
+        if hedged or time.monotonic() - start >= timeout:
+            if not done:
+                raise TimeoutError(f"{name} 단계가 {timeout:.1f}초 안에 끝나지 않았습니다.")
+            continue
+
+        trace["fallbacks"].append(f"{name}_retried" if done else f"{name}_hedged")
+        pending.add(_submit(_executor, trace, f"{name}_hedge", fn))
+        hedged = True
+    raise error
+
+
+def _cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
\ No newline at end of file
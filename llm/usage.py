@@ -0,0 +1,78 @@
+from typing import Dict, Optional
+
+from config import PRICE_INPUT_PER_1M, PRICE_CACHED_INPUT_PER_1M, PRICE_OUTPUT_PER_1M, SESSION_COST_BUDGET_USD
+
+
+def extract_usage(response) -> Dict[str, float]:
+    """
+    chat completion 응답의 usage에서 토큰 수와 예상 비용을 뽑는다.
+    cached_tokens는 prompt_tokens 중 프롬프트 prefix 캐시에서 처리된 토큰 수다.
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+
+    details = getattr(usage, "prompt_tokens_details", None)
+    record = {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+    }
+    record["cost_usd"] = estimate_cost(record)
+    return record
+
+
+def estimate_cost(usage: Dict[str, float]) -> float:
+    """캐시된 입력 토큰은 할인 단가로, 나머지 입력/출력 토큰은 정가로 계산한다."""
+    cached = usage.get("cached_tokens", 0)
+    uncached = usage.get("prompt_tokens", 0) - cached
+    return (
+        uncached * PRICE_INPUT_PER_1M
+        + cached * PRICE_CACHED_INPUT_PER_1M
+        + usage.get("completion_tokens", 0) * PRICE_OUTPUT_PER_1M
+    ) / 1_000_000
+
+
+def record_usage(totals: Dict[str, float], usage: Dict[str, float], completion_seconds: Optional[float]) -> None:
+    """요청 1건의 사용량을 세션 누계(totals)에 더한다. prefix 캐시 적중 여부별로 응답 시간도 모은다."""
+    if not usage:
+        return
+
+    for key in ("prompt_tokens", "completion_tokens", "cached_tokens", "cost_usd"):
+        totals[key] = totals.get(key, 0) + usage.get(key, 0)
+    totals["requests"] = totals.get("requests", 0) + 1
+
+    if completion_seconds is not None:
+        bucket = "cache_hit" if usage.get("cached_tokens") else "cache_miss"
+        totals[f"{bucket}_requests"] = totals.get(f"{bucket}_requests", 0) + 1
+        totals[f"{bucket}_seconds"] = totals.get(f"{bucket}_seconds", 0.0) + completion_seconds
+
+
+def format_budget_report(totals: Dict[str, float]) -> str:
+    """세션 누계를 토큰/비용/캐시 적중 요약 문자열(markdown)로 만든다."""
+    requests = totals.get("requests", 0)
+    if not requests:
+        return "아직 기록된 사용량이 없어요."
+
+    prompt_tokens = totals.get("prompt_tokens", 0)
+    cached_tokens = totals.get("cached_tokens", 0)
+    cost = totals.get("cost_usd", 0.0)
+    # 캐시가 없었다면 들었을 비용과 비교해 절감액을 보여준다
+    saved = cached_tokens * (PRICE_INPUT_PER_1M - PRICE_CACHED_INPUT_PER_1M) / 1_000_000
+
+    lines = [
+        f"- 요청 수: {requests}건",
+        f"- 입력 토큰: {prompt_tokens:,} (캐시 {cached_tokens:,}, {cached_tokens / prompt_tokens if prompt_tokens else 0:.1%})",
+        f"- 출력 토큰: {totals.get('completion_tokens', 0):,}",
+        f"- 예상 비용: ${cost:.4f} (캐시 절감 ${saved:.4f})",
+    ]
+
+    for bucket, label in (("cache_hit", "캐시 적중"), ("cache_miss", "캐시 미적중")):
+        count = totals.get(f"{bucket}_requests", 0)
+        if count:
+            lines.append(f"- {label} 평균 응답 시간: {totals[f'{bucket}_seconds'] / count:.2f}s ({count}건)")
+
+    if SESSION_COST_BUDGET_USD > 0:
+        lines.append(f"- 세션 예산 사용률: {cost / SESSION_COST_BUDGET_USD:.1%} (${SESSION_COST_BUDGET_USD:.2f})")
+
+    return "\n".join(lines)
@@ -5,8 +5,24 @@ import pandas as pd
 import streamlit as st
 from config import CATEGORY_CONFIG
 from llm.rag import get_answer
+from llm.usage import format_budget_report, record_usage
 from util.blob_storage import upload_blob_and_get_url
 
+# 지연으로 인해 적용된 대체 경로 안내 문구
+FALLBACK_LABELS = {
+    "embedding_timeout": "임베딩 지연으로 키워드 + 시맨틱 검색만 사용했어요.",
+    "embedding_error": "임베딩 오류로 키워드 + 시맨틱 검색만 사용했어요.",
+    "search_hedged": "검색 지연으로 동일한 검색 요청을 한 번 더 보냈어요.",
+    "search_retried": "검색 오류로 동일한 검색 요청을 한 번 더 보냈어요.",
+    "search_timeout": "검색 응답이 시간 안에 오지 않았어요.",
+    "search_error": "검색 요청이 실패했어요.",
+    "facets_timeout": "통계 집계가 늦어져 리뷰 분포 없이 답변했어요.",
+    "facets_error": "통계 집계에 실패해 리뷰 분포 없이 답변했어요.",
+    "facets_unweighted": "일부 항목의 리뷰 분포는 중복 리뷰 수를 반영하지 못해 대표 리뷰 기준으로 보여드려요.",
+    "completion_timeout": "답변 생성이 시간 안에 끝나지 않았어요.",
+    "completion_error": "답변 생성 요청이 실패했어요.",
+}
+
 
 def main() -> None:
     st.set_page_config(page_title="LLM PoC Chat", page_icon="💬", layout="centered")
@@ -14,6 +30,7 @@ def main() -> None:
     render_system_prompt()
 
     render_chat_history()
+    render_usage_report()
 
     user_prompt = st.chat_input("메시지를 입력하세요.")
     if user_prompt:
@@ -39,6 +56,12 @@ def initialize_session_state() -> None:
     if "active_controls_context" not in st.session_state:
         st.session_state.active_controls_context = "system"
 
+    if "retrieval_cache" not in st.session_state:
+        st.session_state.retrieval_cache = {}
+
+    if "usage_totals" not in st.session_state:
+        st.session_state.usage_totals = {}
+
 def reload_checklist() -> None:
     """새 체크리스트를 샘플링하고 관련 세션 상태를 초기화."""
     st.session_state.filter_options = {}
@@ -107,7 +130,16 @@ def handle_user_message(user_text: str) -> None:
 
     with st.chat_message("assistant"):
         with st.spinner("응답 생성 중...", show_time=True):
-            rag_answer, summary_stats, sources = get_answer(user_text, selected_filters)
+            rag_answer, summary_stats, sources, trace = get_answer(
+                user_text, selected_filters, st.session_state.retrieval_cache
+            )
+
+    if trace:
+        record_usage(
+            st.session_state.usage_totals,
+            trace.get("usage"),
+            trace.get("stage_seconds", {}).get("completion"),
+        )
 
     active_filters = get_active_filters()
     filters_summary = format_filter_summary(active_filters)
@@ -145,9 +177,16 @@ def handle_user_message(user_text: str) -> None:
         "role": "assistant",
         "content": "\n".join(line for line in response_lines if line is not None),
         "show_reload_button": True,
-        "show_checklist_controls": False
+        "show_checklist_controls": False,
+        "trace": trace,
     }
 
+    fallbacks = trace.get("fallbacks") if trace else None
+    if fallbacks:
+        dict_message["caption"] = " ".join(
+            FALLBACK_LABELS.get(fallback, fallback) for fallback in fallbacks
+        )
+
     if sources:
         df = pd.DataFrame(sources)
         buffer = io.StringIO()
@@ -203,6 +242,12 @@ def format_filter_summary(active: Dict[str, List[str]]) -> str:
     return "\n".join(summary_lines)
 
 
+def render_usage_report() -> None:
+    with st.sidebar:
+        st.markdown("### 토큰 사용량")
+        st.markdown(format_budget_report(st.session_state.usage_totals))
+
+
 def render_chat_history() -> None:
     for idx, message in enumerate(st.session_state.messages):
         with st.chat_message(message["role"]):
@@ -0,0 +1,236 @@
+"""
+느리거나 실패하는 로컬 스텁으로 get_answer의 지연/오류 대체 경로(fallback)를 점검한다.
+Azure 호출 없이 실행되며, 각 시나리오에서 기록된 fallback이 기대와 다르면 AssertionError가 난다.
+후속 질문의 프롬프트가 prefix 캐시를 쓸 수 있도록 같은 바이트열로 시작하는지도 함께 확인한다.
+
+    python -m util.check_fallbacks
+"""
+import os
+import threading
+import time
+
+# config는 import 시점에 환경 변수를 읽으므로 llm.rag보다 먼저 짧은 데드라인을 설정한다
+os.environ.update({
+    "REQUEST_BUDGET_SEC": "3",
+    "EMBED_DEADLINE_SEC": "0.2",
+    "SEARCH_HEDGE_AFTER_SEC": "0.2",
+    "SEARCH_DEADLINE_SEC": "0.8",
+    "FACETS_DEADLINE_SEC": "0.5",
+    "DEDUP_WEIGHTED_FACETS": "0",
+    "RETRIEVAL_CACHE_MIN_SCORE": "0.5",
+    "MAX_CONCURRENT_REQUESTS": "4",
+})
+
+import httpx
+from azure.core.exceptions import HttpResponseError
+from openai import APITimeoutError, InternalServerError, RateLimitError
+
+from llm.prompt import PROMPT_INSIGHT_SYSTEM
+from llm import rag
+from llm.rag import get_answer, weight_facets
+
+SLOW = 2.0  # 어떤 데드라인보다도 긴 지연
+_STUB_REQUEST = httpx.Request("POST", "https://stub/")
+
+FILTERS = {"gender": None, "age_group": "30대", "product_group": "스킨케어"}
+DOCS = [
+    {
+        "product_name": "아쿠아 수분크림",
+        "product_group": "스킨케어",
+        "gender": "여성",
+        "age_group": "30대",
+        "rating": 5,
+        "review_text": f"보습이 오래가요. ({i})",
+        "review_vector": vector,
+    }
+    for i, vector in enumerate([[1.0, 0.0], [0.9, 0.3], [0.8, 0.5], [0.95, 0.1], [0.7, 0.6]])
+]
+FACETS = {"gender": [{"value": "여성", "count": 3}, {"value": "남성", "count": 2}]}
+
+
+class StubEmbeddings:
+    def __init__(self, delay: float = 0.0, vector=(1.0, 0.0), error: Exception = None):
+        self.delay = delay
+        self.vector = list(vector)
+        self.error = error
+
+    def embed_query(self, text: str):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.vector
+
+
+class _FacetResult:
+    def __init__(self, facets: dict):
+        self._facets = facets
+
+    def get_facets(self):
+        return self._facets
+
+
+class StubSearchClient:
+    """
+    search_delays 순서대로 본 검색 호출을 지연시킨다(hedged 요청은 두 번째 값).
+    search_errors의 n번째 값이 있으면 n번째 본 검색 호출은 그 오류를 던진다.
+    """
+
+    def __init__(self, search_delays=(0.0,), facet_delay: float = 0.0, search_errors=(), facet_error: Exception = None):
+        self.search_delays = list(search_delays)
+        self.facet_delay = facet_delay
+        self.search_errors = list(search_errors)
+        self.facet_error = facet_error
+        self.search_calls = []
+        self._lock = threading.Lock()
+
+    def search(self, **kwargs):
+        if kwargs.get("top") == 0:
+            time.sleep(self.facet_delay)
+            if self.facet_error is not None:
+                raise self.facet_error
+            return _FacetResult(FACETS)
+
+        with self._lock:
+            self.search_calls.append(kwargs)
+            index = len(self.search_calls) - 1
+        time.sleep(self.search_delays[min(index, len(self.search_delays) - 1)])
+        if index < len(self.search_errors) and self.search_errors[index] is not None:
+            raise self.search_errors[index]
+        return list(DOCS)
+
+
+class _Completions:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, **kwargs):
+        self.client.calls.append(kwargs)
+        timeout = self.client.options.get("timeout")
+        if timeout is not None and self.client.delay > timeout:
+            time.sleep(timeout)
+            raise APITimeoutError(request=_STUB_REQUEST)
+        time.sleep(self.client.delay)
+        if self.client.error is not None:
+            raise self.client.error
+        message = type("Message", (), {"content": "요약 인사이트"})()
+        return type("Response", (), {"choices": [type("Choice", (), {"message": message})()], "usage": None})()
+
+
+class StubOpenAI:
+    def __init__(self, delay: float = 0.0, options: dict = None, calls: list = None, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.options = options or {}
+        self.calls = calls if calls is not None else []
+        self.chat = type("Chat", (), {"completions": _Completions(self)})()
+
+    def with_options(self, **options):
+        return StubOpenAI(self.delay, options, self.calls, self.error)
+
+
+def run(name: str, expected: list, cache: dict = None, user_text: str = "보습 좋은 제품", **clients) -> tuple:
+    clients.setdefault("openai_client", StubOpenAI())
+    clients.setdefault("search_client", StubSearchClient())
+    clients.setdefault("embeddings", StubEmbeddings())
+
+    started = time.monotonic()
+    answer, stats, sources, trace = get_answer(user_text, FILTERS, cache, **clients)
+    elapsed = time.monotonic() - started
+
+    assert trace["fallbacks"] == expected, f"{name}: {trace['fallbacks']} != {expected}"
+    print(f"[OK] {name}: fallbacks={trace['fallbacks']} ({elapsed:.2f}s)")
+    return answer, stats, sources, trace
+
+
+def main() -> None:
+    _, _, sources, trace = run("정상", [])
+    assert "duplicate_count" not in sources[0], "가중 통계를 끄면 출처에 duplicate_count가 없어야 합니다."
+    assert {"embedding_queue", "search_queue", "facets_queue"} <= trace["stage_seconds"].keys()
+
+    # 워커 풀이 다른 질문으로 가득 차 있으면 대기열 시간 때문에 데드라인을 넘기며, 그 시간은 따로 기록된다
+    blockers = [rag._executor.submit(time.sleep, 0.4) for _ in range(rag._executor._max_workers)]
+    _, _, _, trace = run("워커 풀 포화", ["embedding_timeout"])
+    assert trace["stage_seconds"]["embedding_queue"] >= 0.2, trace["stage_seconds"]
+    for blocker in blockers:
+        blocker.result()
+
+    search_client = StubSearchClient()
+    run("임베딩 지연", ["embedding_timeout"], embeddings=StubEmbeddings(SLOW), search_client=search_client)
+    assert search_client.search_calls[0]["vector_queries"] is None, "임베딩 지연 시 벡터 검색이 빠져야 합니다."
+
+    search_client = StubSearchClient(search_delays=(SLOW, 0.0))
+    run("검색 지연 → hedging", ["search_hedged"], search_client=search_client)
+    assert len(search_client.search_calls) == 2
+
+    run("검색 데드라인 초과", ["search_hedged", "search_timeout"], search_client=StubSearchClient(search_delays=(SLOW,)))
+
+    cache = {}
+    _, stats, _, _ = run("통계 지연", ["facets_timeout"], cache=cache, search_client=StubSearchClient(facet_delay=SLOW))
+    assert stats is None and cache["facets"] is None
+
+    search_client = StubSearchClient()
+    _, stats, _, trace = run("캐시 적중 시 통계 재요청", [], cache=cache, search_client=search_client)
+    assert trace.get("retrieval_cache_hit") and not search_client.search_calls
+    assert stats and cache["facets"] == FACETS
+
+    run("답변 생성 지연", ["completion_timeout"], openai_client=StubOpenAI(delay=5.0))
+
+    # SDK 재시도를 껐으므로 일시적인 429/5xx도 예외로 새지 않고 단계별로 대체되어야 한다
+    rate_limited = RateLimitError("rate limited", response=httpx.Response(429, request=_STUB_REQUEST), body=None)
+    search_client = StubSearchClient()
+    run("임베딩 429", ["embedding_error"], embeddings=StubEmbeddings(error=rate_limited), search_client=search_client)
+    assert search_client.search_calls[0]["vector_queries"] is None
+
+    search_client = StubSearchClient(search_errors=[HttpResponseError(message="503 Service Unavailable")])
+    run("검색 일시 오류 → 재요청", ["search_retried"], search_client=search_client)
+    assert len(search_client.search_calls) == 2
+
+    answer, _, _, _ = run(
+        "검색 오류", ["search_retried", "search_error"],
+        search_client=StubSearchClient(search_errors=[HttpResponseError(message="503")] * 2),
+    )
+    assert answer.startswith("검색 중 오류")
+
+    _, stats, _, _ = run("통계 오류", ["facets_error"], search_client=StubSearchClient(facet_error=HttpResponseError(message="503")))
+    assert stats is None
+
+    server_error = InternalServerError("server error", response=httpx.Response(500, request=_STUB_REQUEST), body=None)
+    run("답변 생성 오류", ["completion_error"], openai_client=StubOpenAI(error=server_error))
+
+    # 질문 벡터가 달라 캐시 문서의 유사도 순위가 바뀌어도, 프롬프트는 질문 직전까지 같은 바이트열이어야 한다
+    cache = {}
+    openai_client = StubOpenAI()
+    run("첫 질문", [], cache=cache, openai_client=openai_client)
+    run("후속 질문 1", [], cache=cache, user_text="향은 어떤가요?",
+        openai_client=openai_client, embeddings=StubEmbeddings(vector=(0.6, 0.8)))
+    run("후속 질문 2", [], cache=cache, user_text="재구매 의사는?",
+        openai_client=openai_client, embeddings=StubEmbeddings(vector=(1.0, 0.1)))
+    first, second = (call["messages"] for call in openai_client.calls[1:])
+    assert first[0]["content"] == second[0]["content"] == PROMPT_INSIGHT_SYSTEM
+    shared = os.path.commonprefix([first[1]["content"], second[1]["content"]])
+    assert shared == first[1]["content"].split("질문 내용은")[0] + "질문 내용은 다음과 같습니다:\n"
+    print(f"[OK] 후속 질문 프롬프트 공통 prefix: system {len(PROMPT_INSIGHT_SYSTEM)}자 + user {len(shared)}자")
+
+    # 한 필드의 값 하나라도 가중하지 못하면 그 필드는 통째로 대표 리뷰 수로 남아야 한다
+    facets = {
+        "gender": [{"value": "여성", "count": 100}, {"value": "남성", "count": 50}],
+        "product_group": [{"value": "스킨케어", "count": 100}, {"value": "향수", "count": 40}],
+    }
+
+    def fetch_duplicate_buckets(value_filter: str) -> list:
+        if value_filter == "product_group eq '향수'":
+            time.sleep(SLOW)
+        return [{"value": 1, "count": 10}, {"value": 3, "count": 5}]
+
+    trace = {"fallbacks": []}
+    weighted = weight_facets(facets, fetch_duplicate_buckets, timeout=0.3, trace=trace)
+    assert weighted["gender"] == [{"value": "여성", "count": 110}, {"value": "남성", "count": 60}]
+    assert weighted["product_group"] == facets["product_group"]
+    assert trace["fallbacks"] == ["facets_unweighted"] and trace["unweighted_facets"] == ["product_group"]
+    print(f"[OK] 통계 가중(필드 단위): unweighted={trace['unweighted_facets']}")
+
+    print("모든 fallback 시나리오 통과")
+
+
+if __name__ == "__main__":
+    main()
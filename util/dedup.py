@@ -0,0 +1,219 @@
+import re
+import sys
+import time
+import zlib
+from array import array
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from config import CATEGORY_CONFIG
+
+# =========================
+# 0) MinHash / LSH 설정
+# =========================
+
+NUM_PERM = 64       # MinHash 서명 길이
+LSH_BANDS = 8       # 밴드 수(밴드당 NUM_PERM // LSH_BANDS행), 자카드 유사도 약 0.77 이상에서 후보로 묶임
+SHINGLE_SIZE = 3    # 문자 n-gram 크기(한국어 리뷰는 단어보다 문자 단위가 안정적)
+
+DEDUP_THRESHOLD = 0.8  # LSH 후보를 중복으로 인정할 최소 추정 자카드 유사도(같은 서명 칸 비율)
+
+# 대표 리뷰로 합쳐져도 필터/facet 결과가 달라지지 않도록, facet/필터에 쓰는 필드 값이 같은 리뷰끼리만 묶는다.
+# product_name, rating은 키에 넣지 않으므로 묶인 리뷰는 대표 리뷰의 제품명/평점으로 보인다.
+GROUP_FIELDS = tuple(cfg["key"] for cfg in CATEGORY_CONFIG)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_KEY_MASK = (1 << 64) - 1
+_NON_WORD = re.compile(r"[^\w]+")
+
+_rng = np.random.default_rng(1)
+# a, b를 32비트 안으로 두어 a * x + b가 uint64 범위를 넘지 않게 한다
+_PERM_A = _rng.integers(1, _MAX_HASH, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MAX_HASH, size=NUM_PERM, dtype=np.uint64)
+
+
+def _shingles(text: str) -> np.ndarray:
+    normalized = _NON_WORD.sub(" ", text or "").strip().lower()
+    if len(normalized) <= SHINGLE_SIZE:
+        grams = {normalized}
+    else:
+        grams = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """문자 n-gram 집합의 MinHash 서명((a * x + b) mod p 해시 NUM_PERM개의 최솟값)."""
+    hashes = _shingles(text)
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=1)
+
+
+class _BandTable:
+    """
+    LSH 밴드 키(64비트) → 대표 번호를 담는 open addressing(선형 탐사) 해시 테이블.
+    키마다 Python int 객체와 dict 항목(약 90B)을 만드는 대신 array 두 개에 담아 칸당 12B만 쓴다.
+    키 0은 빈 칸 표시로 쓰므로 호출하는 쪽에서 0이 아닌 키만 넣는다.
+    """
+
+    _MAX_LOAD = 0.7
+
+    def __init__(self, capacity: int = 1 << 16):
+        self.keys = array("Q", bytes(8 * capacity))
+        self.values = array("i", bytes(4 * capacity))
+        self.size = 0
+
+    def get(self, key: int) -> int:
+        """key의 대표 번호, 없으면 -1."""
+        mask = len(self.keys) - 1
+        slot = key & mask
+        while True:
+            stored = self.keys[slot]
+            if stored == key:
+                return self.values[slot]
+            if stored == 0:
+                return -1
+            slot = (slot + 1) & mask
+
+    def setdefault(self, key: int, value: int) -> None:
+        """아직 없는 키에만 value를 넣는다(이미 있는 키는 먼저 들어온 대표를 유지)."""
+        if self.size + 1 > self._MAX_LOAD * len(self.keys):
+            self._grow()
+        mask = len(self.keys) - 1
+        slot = key & mask
+        while True:
+            stored = self.keys[slot]
+            if stored == key:
+                return
+            if stored == 0:
+                self.keys[slot] = key
+                self.values[slot] = value
+                self.size += 1
+                return
+            slot = (slot + 1) & mask
+
+    def _grow(self) -> None:
+        old_keys, old_values = self.keys, self.values
+        self.keys = array("Q", bytes(16 * len(old_keys)))
+        self.values = array("i", bytes(8 * len(old_values)))
+        self.size = 0
+        for key, value in zip(old_keys, old_values):
+            if key:
+                self.setdefault(key, value)
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.itemsize * len(self.keys) + self.values.itemsize * len(self.values)
+
+
+# =========================
+# 1) 스트리밍 중복 제거
+# =========================
+def dedup_rows(rows: Iterable[Dict], stats: Dict, threshold: float = DEDUP_THRESHOLD) -> Iterator[Dict]:
+    """
+    리뷰 행을 한 번만 훑으며 근사 중복을 묶고, 각 클러스터의 첫 리뷰(대표)만 내보낸다.
+
+    같은 GROUP_FIELDS 값을 가진 리뷰끼리 MinHash 서명을 LSH 밴드 버킷에 넣어 후보 대표를 찾고,
+    저장해 둔 대표 서명과의 추정 자카드 유사도(같은 칸 수 / NUM_PERM)가 threshold 이상일 때만
+    그 대표의 중복으로 센다. 후보가 없거나 모두 threshold 미만이면 새 대표가 된다.
+
+    대표 리뷰에는 duplicate_count=1을 붙여 내보내며, 이후 늘어난 건수는
+    stats["duplicate_counts"](대표 review_id → 클러스터 크기)에 기록된다.
+    stats에는 rows_in, rows_out, seconds(중복 판정에 쓴 시간), state_bytes(버킷/서명/대표 id 메모리)도 기록된다.
+
+    상태는 대표 리뷰 수에 비례해 대표당 약 300B를 쓴다(1,000만 대표면 약 3GiB).
+    버킷이 GROUP_FIELDS 값별로 나뉘어 있으므로, 입력을 product_group 등으로 나눠 따로 적재해도
+    결과는 같고 메모리는 가장 큰 조각 기준으로 줄어든다.
+    """
+    rows_per_band = NUM_PERM // LSH_BANDS
+    # 밴드 키 → 대표 번호. 대표 서명은 칸마다 하위 16비트만 (대표 수, NUM_PERM) 배열에 모아 둔다(대표당 128B).
+    # 16비트로 줄여도 다른 해시값이 같은 칸으로 보일 확률은 1/65536이라 유사도 추정에는 영향이 거의 없다
+    buckets = _BandTable()
+    # 대표 review_id는 문자열 객체 대신 이어 붙인 바이트열 + 끝 위치로 보관한다
+    representative_ids = bytearray()
+    id_ends = array("Q")
+    signatures = np.empty((1024, NUM_PERM), dtype=np.uint16)
+    cluster_sizes: Dict[int, int] = {}
+    stats.update({"rows_in": 0, "rows_out": 0, "seconds": 0.0, "duplicate_counts": {}})
+
+    for r in rows:
+        started = time.perf_counter()
+        stats["rows_in"] += 1
+
+        group = tuple(r.get(field, "") for field in GROUP_FIELDS)
+        signature = minhash_signature(r.get("review_text", "")).astype(np.uint32)
+        keys = [
+            hash((group, band, signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes())) & _KEY_MASK or 1
+            for band in range(LSH_BANDS)
+        ]
+        found = [buckets.get(k) for k in keys]
+        compact = signature.astype(np.uint16)
+
+        candidates = sorted({representative for representative in found if representative >= 0})
+        if candidates:
+            similarities = (signatures[candidates] == compact).mean(axis=1)
+            best = int(similarities.argmax())
+            if similarities[best] >= threshold:
+                representative = candidates[best]
+                cluster_sizes[representative] = cluster_sizes.get(representative, 1) + 1
+                stats["seconds"] += time.perf_counter() - started
+                continue
+
+        representative = len(id_ends)
+        if representative >= len(signatures):
+            signatures = np.concatenate([signatures, np.empty((len(signatures) // 2, NUM_PERM), dtype=signatures.dtype)])
+        signatures[representative] = compact
+        representative_ids += str(r.get("review_id")).encode("utf-8")
+        id_ends.append(len(representative_ids))
+        for k, existing in zip(keys, found):
+            if existing < 0:
+                buckets.setdefault(k, representative)
+
+        stats["rows_out"] += 1
+        stats["seconds"] += time.perf_counter() - started
+        yield {**r, "duplicate_count": 1}
+
+    stats["duplicate_counts"] = {
+        representative_ids[id_ends[i - 1] if i else 0:id_ends[i]].decode("utf-8"): size
+        for i, size in cluster_sizes.items()
+    }
+    # 확보해 둔 배열 크기 기준(빈 칸 포함)
+    stats["state_bytes"] = (
+        buckets.nbytes
+        + signatures.nbytes
+        + len(representative_ids)
+        + id_ends.itemsize * len(id_ends)
+        + sys.getsizeof(cluster_sizes)
+    )
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # Linux는 KB, macOS는 byte 단위로 돌려준다
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_dedup_report(stats: Dict) -> str:
+    """중복 제거 비율과 100만 건당 처리 시간, 중복 판정 상태가 차지하는 메모리를 요약한다."""
+    rows_in = stats.get("rows_in", 0)
+    rows_out = stats.get("rows_out", 0)
+    if not rows_in:
+        return "Dedup: 입력 리뷰가 없습니다."
+
+    dedup_ratio = 1 - rows_out / rows_in
+    seconds_per_million = stats.get("seconds", 0.0) / rows_in * 1_000_000
+    state_bytes = stats.get("state_bytes", 0)
+    peak_rss = _peak_rss_bytes()
+    return (
+        f"Dedup: {rows_in}건 → 대표 {rows_out}건 "
+        f"(중복 제거율 {dedup_ratio:.1%}, 클러스터 {len(stats.get('duplicate_counts', {}))}개, "
+        f"{seconds_per_million:.1f}s / 1M rows, "
+        f"상태 메모리 약 {state_bytes / 2**20:.1f}MiB = 대표당 {state_bytes / max(rows_out, 1):.0f}B"
+        + (f", 프로세스 최대 RSS {peak_rss / 2**20:.0f}MiB" if peak_rss else "")
+        + ")"
+    )
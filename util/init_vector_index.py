@@ -1,7 +1,7 @@
 import os
 import csv
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, Iterator, List
 
 # Azure Search SDK
 from azure.core.credentials import AzureKeyCredential
@@ -26,6 +26,9 @@ from azure.search.documents.indexes.models import (
 from langchain_openai import AzureOpenAIEmbeddings
 from dotenv import load_dotenv
 
+from config import DEDUP_WEIGHTED_FACETS
+from util.dedup import dedup_rows, format_dedup_report
+
 load_dotenv()
 
 # =========================
@@ -40,6 +43,13 @@ AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 AZURE_OPENAI_EMBED_DEPLOYMENT = os.getenv("AZURE_OPENAI_EMBED_DEPLOYMENT")
 AZURE_SEARCH_INDEX_NAME = os.getenv("AZURE_SEARCH_INDEX_NAME")
 CSV_PATH  = os.getenv("CSV_PATH")
+# "1"이면 API 호출 없이 로컬 합성 임베딩을 사용(대용량 합성 데이터 적재 벤치마크용)
+USE_SYNTHETIC_EMBEDDINGS = os.getenv("USE_SYNTHETIC_EMBEDDINGS") == "1"
+# 근사 중복 리뷰 제거(MinHash/LSH)는 통계 가중(DEDUP_WEIGHTED_FACETS=1)과 함께만 켠다.
+# 대표 리뷰만 적재하고 통계에서 duplicate_count를 더하지 않으면 리뷰 수가 줄어든 채로 보이기 때문이다.
+DEDUP_ENABLED = DEDUP_WEIGHTED_FACETS
+# 근사 중복으로 묶을 최소 추정 자카드 유사도
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
 
 # =========================
 # 1) 클라이언트 준비
@@ -49,12 +59,16 @@ search_credential = AzureKeyCredential(AZURE_SEARCH_API_KEY)
 index_client  = SearchIndexClient(endpoint=AZURE_SEARCH_ENDPOINT, credential=search_credential)
 search_client = SearchClient(endpoint=AZURE_SEARCH_ENDPOINT, index_name=AZURE_SEARCH_INDEX_NAME, credential=search_credential)
 
-embeddings = AzureOpenAIEmbeddings(
-    azure_deployment=AZURE_OPENAI_EMBED_DEPLOYMENT,
-    openai_api_version="2024-12-01-preview",
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    api_key=AZURE_OPENAI_API_KEY,
-)
+if USE_SYNTHETIC_EMBEDDINGS:
+    from util.synthetic_reviews import SyntheticEmbeddings
+    embeddings = SyntheticEmbeddings()
+else:
+    embeddings = AzureOpenAIEmbeddings(
+        azure_deployment=AZURE_OPENAI_EMBED_DEPLOYMENT,
+        openai_api_version="2024-12-01-preview",
+        azure_endpoint=AZURE_OPENAI_ENDPOINT,
+        api_key=AZURE_OPENAI_API_KEY,
+    )
 
 # 임베딩 차원 
 EMBED_DIM = 1536  # "text-embedding-3-small" 모델 기준
@@ -69,6 +83,8 @@ fields = [
     SearchableField(name="gender",       type=SearchFieldDataType.String, filterable=True, facetable=True),
     SearchableField(name="age_group",    type=SearchFieldDataType.String, filterable=True, facetable=True),
     SimpleField(   name="rating",        type=SearchFieldDataType.Double, filterable=True, sortable=True, facetable=True),
+    # 대표 리뷰가 대신하는 근사 중복 리뷰 수(자기 자신 포함), facet 통계 가중치로 사용
+    SimpleField(   name="duplicate_count", type=SearchFieldDataType.Int32, filterable=True, sortable=True, facetable=True),
     SearchableField(name="review_text",  type=SearchFieldDataType.String),
     # 벡터 필드
     SearchField(
@@ -139,11 +155,27 @@ def embed_texts(texts: List[str]) -> List[List[float]]:
     # LangChain: embed_documents는 리스트 입력을 받아 임베딩을 수행
     return embeddings.embed_documents(texts)
 
+def read_rows(path: str) -> Iterator[Dict]:
+    """CSV 또는 Parquet(util/synthetic_reviews.py 출력) 파일의 리뷰 행을 스트리밍으로 읽는다."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Parquet 입력에는 pyarrow가 필요합니다.") from exc
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=10000):
+            yield from record_batch.to_pylist()
+        return
+
+    with open(path, "r", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f)
+
 def load_and_upload(csv_path: str, batch_size: int = 64):
-    with open(csv_path, "r", encoding="utf-8-sig") as f:
-        rows = list(csv.DictReader(f))
-    
-    # 배치 단위로 임베딩 및 업서트
+    # 대용량 파일도 메모리에 모두 올리지 않도록 배치 단위로 읽으면서 임베딩 및 업서트
+    rows = read_rows(csv_path)
+    dedup_stats: Dict = {}
+    if DEDUP_ENABLED:
+        rows = dedup_rows(rows, dedup_stats, threshold=DEDUP_THRESHOLD)
+
     for rows_batch in chunked(rows, batch_size):
         texts = [r.get("review_text", "") or "" for r in rows_batch]
         vecs  = embed_texts(texts)
@@ -157,6 +189,7 @@ def load_and_upload(csv_path: str, batch_size: int = 64):
                 "gender":        r.get("gender", ""),
                 "age_group":     r.get("age_group", ""),
                 "rating":        r.get("rating"),
+                "duplicate_count": r.get("duplicate_count", 1),
                 "review_text":   r.get("review_text", ""),
                 "review_vector": v,
                 "created_at":    to_iso_utc(r.get("created_at", "")),
@@ -168,6 +201,19 @@ def load_and_upload(csv_path: str, batch_size: int = 64):
         if failed:
             raise RuntimeError(f"Upload failed for {len(failed)} docs. First error: {failed[0].error_message}")
         print(f"Uploaded batch of {len(docs_batch)} documents.")
+
+    if DEDUP_ENABLED:
+        # 스트리밍 중에는 클러스터 크기를 알 수 없으므로, 적재 후 대표 리뷰의 duplicate_count만 갱신
+        counts = [
+            {"review_id": review_id, "duplicate_count": count}
+            for review_id, count in dedup_stats["duplicate_counts"].items()
+        ]
+        for counts_batch in chunked(counts, 1000):
+            result = search_client.merge_documents(counts_batch)
+            failed = [r for r in result if not r.succeeded]
+            if failed:
+                raise RuntimeError(f"duplicate_count update failed for {len(failed)} docs. First error: {failed[0].error_message}")
+        print(format_dedup_report(dedup_stats))
     
     print("All documents uploaded.")
 
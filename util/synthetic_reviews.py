@@ -0,0 +1,264 @@
+import argparse
+import bisect
+import csv
+import hashlib
+import os
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from config import CATEGORY_CONFIG
+
+# =========================
+# 0) 상수
+# =========================
+
+SEED_CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "review_poc.csv")
+FIELDNAMES = ["review_id", "product_name", "product_group", "gender", "age_group", "rating", "review_text", "created_at"]
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+EMBED_DIM = 1536  # "text-embedding-3-small" 모델과 같은 차원
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+# =========================
+# 1) 시드 CSV → 분포 추출
+# =========================
+def load_seed_profile(seed_csv_path: str = SEED_CSV_PATH) -> Dict:
+    """
+    시드 CSV(review_poc.csv)에서 합성 데이터 생성에 쓸 분포를 추출한다.
+
+    - CATEGORY_CONFIG 풀 값별 가중치(시드 건수 + 1, 시드에 없는 값도 나오도록 스무딩)
+    - 제품군별 성별/평점 가중치(같은 방식으로 스무딩), 제품군별 제품명 가중치
+    - (제품군, 평점)별 리뷰 문장 풀과 평점별 리뷰당 문장 수 분포
+    - 작성일 범위
+    """
+    with open(seed_csv_path, "r", encoding="utf-8-sig") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        raise ValueError(f"시드 CSV가 비어 있습니다: {seed_csv_path}")
+
+    categories = {}
+    for cfg in CATEGORY_CONFIG:
+        counts = Counter(r.get(cfg["key"], "") for r in rows)
+        categories[cfg["key"]] = {value: counts.get(value, 0) + 1 for value in cfg["pool"]}
+
+    pools = {cfg["key"]: cfg["pool"] for cfg in CATEGORY_CONFIG}
+    rating_pool = sorted({r["rating"] for r in rows})
+    genders_by_group = defaultdict(Counter)
+    ratings_by_group = defaultdict(Counter)
+    product_names = defaultdict(Counter)
+    sentences = defaultdict(Counter)
+    sentence_counts = defaultdict(Counter)
+    for r in rows:
+        genders_by_group[r["product_group"]][r["gender"]] += 1
+        ratings_by_group[r["product_group"]][r["rating"]] += 1
+        product_names[r["product_group"]][r["product_name"]] += 1
+        parts = [s.strip() for s in _SENTENCE_SPLIT.split(r.get("review_text", "")) if s.strip()]
+        sentences[(r["product_group"], r["rating"])].update(parts)
+        sentence_counts[r["rating"]][len(parts)] += 1
+
+    created = [datetime.strptime(r["created_at"], DATE_FORMAT) for r in rows if r.get("created_at")]
+
+    return {
+        "categories": categories,
+        "genders_by_group": {
+            group: {value: genders_by_group[group].get(value, 0) + 1 for value in pools.get("gender", [])}
+            for group in pools.get("product_group", [])
+        },
+        "ratings_by_group": {
+            group: {value: ratings_by_group[group].get(value, 0) + 1 for value in rating_pool}
+            for group in pools.get("product_group", [])
+        },
+        "product_names": {group: dict(names) for group, names in product_names.items()},
+        "sentences": {key: dict(parts) for key, parts in sentences.items()},
+        "sentence_counts": {rating: dict(counts) for rating, counts in sentence_counts.items()},
+        "created_at_range": (min(created).timestamp(), max(created).timestamp()),
+    }
+
+
+class _WeightedChoice:
+    """누적 가중치를 미리 계산해 두고 rng.random() 한 번으로 샘플링한다."""
+
+    def __init__(self, weights: Dict):
+        self.values = list(weights.keys())
+        self.cum_weights = []
+        total = 0
+        for w in weights.values():
+            total += w
+            self.cum_weights.append(total)
+        self.total = total
+
+    def sample(self, rng: random.Random):
+        return self.values[bisect.bisect_right(self.cum_weights, rng.random() * self.total)]
+
+    def sample_distinct(self, rng: random.Random, k: int) -> List:
+        """가중치를 따르되 같은 값을 두 번 고르지 않는다(비복원 추출)."""
+        k = min(k, len(self.values))
+        picked = []
+        for _ in range(k * 20):
+            if len(picked) >= k:
+                break
+            value = self.sample(rng)
+            if value not in picked:
+                picked.append(value)
+        return picked
+
+
+# =========================
+# 2) 합성 리뷰 생성
+# =========================
+def generate_reviews(n_rows: int, seed: int = 42, profile: Dict = None) -> Iterator[Dict]:
+    """
+    기존 CSV 스키마와 같은 리뷰 행을 n_rows개 생성한다(스트리밍).
+    같은 seed와 시드 CSV면 항상 같은 결과를 만든다.
+    """
+    profile = profile or load_seed_profile()
+    rng = random.Random(seed)
+
+    category_choices = {key: _WeightedChoice(weights) for key, weights in profile["categories"].items()}
+    gender_choices = {group: _WeightedChoice(weights) for group, weights in profile["genders_by_group"].items()}
+    rating_choices = {group: _WeightedChoice(weights) for group, weights in profile["ratings_by_group"].items()}
+    name_choices = {group: _WeightedChoice(names) for group, names in profile["product_names"].items()}
+    sentence_choices = {key: _WeightedChoice(parts) for key, parts in profile["sentences"].items()}
+    # 시드에 없는 (제품군, 평점) 조합은 같은 평점의 문장 전체에서 고른다
+    rating_sentences = defaultdict(Counter)
+    for (_, rating), parts in profile["sentences"].items():
+        rating_sentences[rating].update(parts)
+    rating_sentence_choices = {rating: _WeightedChoice(parts) for rating, parts in rating_sentences.items()}
+    count_choices = {rating: _WeightedChoice(counts) for rating, counts in profile["sentence_counts"].items()}
+    start_ts, end_ts = profile["created_at_range"]
+    id_width = max(6, len(str(n_rows)))
+
+    for i in range(1, n_rows + 1):
+        # 성별과 평점은 제품군에 따라 분포가 다르므로 제품군을 먼저 고른 뒤 조건부로 뽑는다
+        row = {key: choice.sample(rng) for key, choice in category_choices.items()}
+        group = row.get("product_group", "")
+        if group in gender_choices:
+            row["gender"] = gender_choices[group].sample(rng)
+        rating = rating_choices[group].sample(rng)
+
+        name_choice = name_choices.get(group)
+        product_name = name_choice.sample(rng) if name_choice else f"{group} 제품"
+
+        sentence_choice = sentence_choices.get((group, rating)) or rating_sentence_choices[rating]
+        n_sentences = count_choices[rating].sample(rng)
+        review_text = " ".join(sentence_choice.sample_distinct(rng, n_sentences))
+
+        created_at = datetime.fromtimestamp(start_ts + rng.random() * (end_ts - start_ts))
+
+        yield {
+            "review_id": f"r-{i:0{id_width}d}",
+            "product_name": product_name,
+            "product_group": group,
+            "gender": row.get("gender", ""),
+            "age_group": row.get("age_group", ""),
+            "rating": rating,
+            "review_text": review_text,
+            "created_at": created_at.strftime(DATE_FORMAT),
+        }
+
+
+# 배치 수행을 위한 Helper
+def chunked(iterable, size):
+    buf = []
+    for it in iterable:
+        buf.append(it)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def write_csv(rows: Iterator[Dict], out_path: str, batch_size: int = 10000) -> int:
+    """리뷰 행을 배치 단위로 CSV에 스트리밍 기록한다. 시드와 같이 utf-8-sig로 저장한다."""
+    written = 0
+    with open(out_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for rows_batch in chunked(rows, batch_size):
+            writer.writerows(rows_batch)
+            written += len(rows_batch)
+    return written
+
+
+def write_parquet(rows: Iterator[Dict], out_path: str, batch_size: int = 100000) -> int:
+    """리뷰 행을 row group 단위로 Parquet에 스트리밍 기록한다."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("Parquet 출력에는 pyarrow가 필요합니다.") from exc
+
+    schema = pa.schema([(name, pa.string()) for name in FIELDNAMES])
+    written = 0
+    with pq.ParquetWriter(out_path, schema) as writer:
+        for rows_batch in chunked(rows, batch_size):
+            writer.write_batch(pa.RecordBatch.from_pylist(rows_batch, schema=schema))
+            written += len(rows_batch)
+    return written
+
+
+# =========================
+# 3) 로컬 합성 임베딩
+# =========================
+class SyntheticEmbeddings:
+    """
+    API 호출 없이 결정적으로 벡터를 만드는 임베딩(AzureOpenAIEmbeddings와 같은 인터페이스).
+    토큰마다 해시 시드로 고정된 난수 벡터를 더해 정규화하므로, 문구를 공유하는 리뷰끼리 유사도가 높다.
+    """
+
+    def __init__(self, dim: int = EMBED_DIM):
+        self.dim = dim
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vec = self._token_vectors.get(token)
+        if vec is None:
+            token_seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vec = np.random.default_rng(token_seed).standard_normal(self.dim).astype(np.float32)
+            self._token_vectors[token] = vec
+        return vec
+
+    def embed_query(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in (text or "").split():
+            vec += self._token_vector(token)
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+# =========================
+# 4) CLI
+# =========================
+def main() -> None:
+    parser = argparse.ArgumentParser(description="review_poc.csv 스키마의 합성 리뷰 데이터를 생성합니다.")
+    parser.add_argument("--rows", type=int, required=True, help="생성할 리뷰 수")
+    parser.add_argument("--out", required=True, help="출력 경로(.csv 또는 .parquet)")
+    parser.add_argument("--seed", type=int, default=42, help="난수 시드")
+    parser.add_argument("--seed-csv", default=SEED_CSV_PATH, help="분포를 추출할 시드 CSV")
+    args = parser.parse_args()
+
+    rows = generate_reviews(args.rows, seed=args.seed, profile=load_seed_profile(args.seed_csv))
+
+    started = time.perf_counter()
+    if args.out.endswith(".parquet"):
+        written = write_parquet(rows, args.out)
+    else:
+        written = write_csv(rows, args.out)
+    elapsed = time.perf_counter() - started
+
+    print(f"{written}건 생성 완료: {args.out} ({elapsed:.1f}s, {written / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()